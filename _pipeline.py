@@ -0,0 +1,133 @@
+"""Per-email work that needs no network: syntax, disposable domains and the verdict.
+
+Kept apart from validate_email so it type-checks strictly and can be compiled
+with mypyc (``mypyc _pipeline.py``); the plain module is used otherwise.
+"""
+import functools
+import os
+import string
+from sys import intern
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+try:
+    # RE2 matches in linear time with no backtracking; stdlib re is the fallback
+    import re2 as re  # type: ignore[import-not-found]
+except ImportError:
+    import re
+
+# -------------------------
+# REGEX SYNTAX
+# -------------------------
+EMAIL_REGEX = re.compile(
+    r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
+)
+
+_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + "._%+-")
+_DOMAIN_CHARS = frozenset(string.ascii_letters + string.digits + ".-")
+
+def validate_syntax(email: str) -> bool:
+    if not email:
+        return False
+    email = email.strip()
+
+    # Cheap rejects before touching the regex engine
+    at = email.find("@")
+    if at <= 0 or at == len(email) - 1 or not email.isascii():
+        return False
+    if not _LOCAL_CHARS.issuperset(email[:at]) or not _DOMAIN_CHARS.issuperset(email[at + 1:]):
+        return False
+
+    return EMAIL_REGEX.match(email) is not None
+
+# -------------------------
+# DISPOSABLE DOMAINS
+# -------------------------
+DISPOSABLE_DOMAINS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "disposable_domains.txt")
+
+def load_disposable_domains(path: str = DISPOSABLE_DOMAINS_FILE) -> FrozenSet[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line.strip().lower() for line in f]
+    except OSError:
+        return frozenset()
+    return frozenset(line for line in lines if line and not line.startswith("#"))
+
+DISPOSABLE_DOMAINS = load_disposable_domains()
+
+# -------------------------
+# HEURISTICS
+# -------------------------
+@functools.lru_cache(maxsize=4096)
+def classify_banner(banner: str) -> str:
+    b = banner.lower()
+    if "google" in b or "gmail" in b:
+        return "google"
+    if "outlook" in b or "microsoft" in b or "hotmail" in b:
+        return "outlook"
+    return "generic"
+
+# (provider, RCPT code) -> decision; big providers don't use 552 for unknown users
+RCPT_DECISIONS: Dict[Tuple[str, int], str] = {
+    **{(p, 250): "alive" for p in ("google", "outlook", "generic")},
+    **{(p, c): "dead" for p in ("google", "outlook") for c in (550, 551, 553)},
+    **{("generic", c): "dead" for c in (550, 551, 552, 553)},
+}
+
+def heuristics(banner: Optional[str], rcpt_code: Optional[int], website_up: bool) -> str:
+    provider = classify_banner(banner or "")
+    code = rcpt_code or 0
+
+    decision = RCPT_DECISIONS.get((provider, code))
+    if decision:
+        return decision
+    # Known providers: trust the website on any other answer; others only when RCPT got nothing
+    if website_up and (provider != "generic" or code == 0):
+        return "likely_alive"
+    return "unknown"
+
+# -------------------------
+# VERDICT
+# -------------------------
+def prefilter(email: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Offline checks only; returns the failing verdict, or None if the network must decide."""
+    email = (email or "").strip()
+    if not validate_syntax(email):
+        return "fail", "bad_syntax"
+
+    _, _, domain = email.rpartition("@")
+    domain = domain.lower()
+    if not domain:
+        return "fail", "bad_domain"
+    if domain in DISPOSABLE_DOMAINS:
+        return "fail", "disposable"
+    return None
+
+def final_verdict(website_up: bool, has_mx: bool, rcpt_code: int, banner: str) -> Tuple[str, str]:
+    """Combine the network answers for one address into (status, reason)."""
+    decision = heuristics(banner, rcpt_code, website_up)
+
+    if website_up and has_mx and rcpt_code == 250:
+        return "pass", "website_up_mx_rcpt250"
+    if decision == "alive" or decision == "likely_alive":
+        return "pass", decision
+    return "fail", decision
+
+# -------------------------
+# CSV ROWS
+# -------------------------
+def cell(row: List[str], idx: Optional[int]) -> str:
+    return row[idx].strip() if idx is not None and idx < len(row) else ""
+
+def row_domain(row: List[str], email_idx: Optional[int]) -> str:
+    _, at, domain = cell(row, email_idx).rpartition("@")
+    if not at:
+        return ""
+    return intern(domain.strip().lower())
+
+def process_row(row: List[str], email_idx: Optional[int], web_idx: Optional[int],
+                validate: Callable[[str, str], Tuple[str, str]]) -> List[str]:
+    """Append (status, reason) from validate(email, web) to the row."""
+    status, reason = validate(cell(row, email_idx), cell(row, web_idx))
+    row.append(status)
+    row.append(reason)
+    return row
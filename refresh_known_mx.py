@@ -0,0 +1,32 @@
+"""Re-resolve the MX records in known_mx.json and rewrite it.
+
+Run offline, e.g. monthly:  python refresh_known_mx.py
+Domains whose lookup fails keep their previous entry.
+"""
+import json
+
+import dns.exception
+
+from validate_email import KNOWN_MX_FILE, RESOLVER, load_known_mx
+
+
+def refresh(path: str = KNOWN_MX_FILE) -> None:
+    known = load_known_mx(path)
+    for domain in sorted(known):
+        try:
+            answers = RESOLVER.resolve(domain, "MX")
+        except dns.exception.DNSException as e:
+            print(f"{domain}: kept previous entry ({e.__class__.__name__})")
+            continue
+        hosts = sorted(str(r.exchange).rstrip(".") for r in answers)
+        if hosts and hosts != known[domain]:
+            print(f"{domain}: {known[domain]} -> {hosts}")
+            known[domain] = hosts
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(known, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    refresh()
@@ -0,0 +1,78 @@
+"""A tiny threaded SMTP server on 127.0.0.1 for the pool and banner tests."""
+import socketserver
+import threading
+import time
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """Answers RCPT with 250, except greylist@… (451) and nobody@… (550)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.port = self.server_address[1]
+        self.connections = 0
+        self.rsets = 0
+        self.quits = 0
+        # Hang up on the next RSET, like a server that timed out an idle session
+        self.drop_on_rset = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.count("connections")
+        self.reply("220 fake.test ESMTP")
+        for raw in self.rfile:
+            line = raw.decode(errors="ignore").strip()
+            cmd = line[:4].upper()
+            if cmd in ("EHLO", "HELO", "MAIL"):
+                self.reply("250 ok")
+            elif cmd == "RCPT":
+                if "<greylist@" in line:
+                    self.reply("451 try again later")
+                elif "<nobody@" in line:
+                    self.reply("550 no such user")
+                else:
+                    self.reply("250 ok")
+            elif cmd == "RSET":
+                server.count("rsets")
+                if server.drop_on_rset:
+                    server.drop_on_rset = False
+                    return
+                self.reply("250 ok")
+            elif cmd == "QUIT":
+                server.count("quits")
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    """Poll predicate until it holds; the server sees client commands asynchronously."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
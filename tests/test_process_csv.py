@@ -0,0 +1,111 @@
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import validate_email
+
+HEADER = ["Email", "Web Address", "Name"]
+RESULT_HEADER = HEADER + validate_email.RESULT_COLS
+
+
+def fake_rcpt(host, email, **kwargs):
+    if host == "mx.err.test":
+        raise RuntimeError("rcpt blew up")
+    return (250 if host == "mx.alive.test" else 550), "fake.test ESMTP"
+
+
+class ProcessCSVTest(unittest.TestCase):
+    """process_csv with every network stage stubbed out."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+        real_batch = validate_email.process_batch
+
+        def process_batch(domain, *args):
+            if domain == "boom.test":
+                raise RuntimeError("batch died")
+            return real_batch(domain, *args)
+
+        patches = [
+            mock.patch.object(validate_email, "CACHE_DB", None),
+            # Small blocks, so rows cross block boundaries
+            mock.patch.object(validate_email, "STREAM_BLOCK", 3),
+            mock.patch.object(validate_email, "prefetch_mx", lambda domains: None),
+            mock.patch.object(validate_email, "prefetch_banners", lambda domains: None),
+            mock.patch.object(validate_email, "check_website", lambda web: False),
+            mock.patch.object(validate_email, "check_mx", lambda domain, *a, **k: [f"mx.{domain}"]),
+            mock.patch.object(validate_email, "smtp_null_sender", fake_rcpt),
+            mock.patch.object(validate_email, "process_batch", process_batch),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_csv(self, rows):
+        paths = [os.path.join(self.dir, name) for name in ("in.csv", "pass.csv", "fail.csv")]
+        with open(paths[0], "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            validate_email.process_csv(*paths, workers=4)
+
+        results = []
+        for path in paths[1:]:
+            with open(path, newline="", encoding="utf-8") as f:
+                results.append(list(csv.reader(f)))
+        return results
+
+    def test_results_keep_input_order(self):
+        rows = [[f"user{i}@{'alive' if i % 3 else 'dead'}.test", "", str(i)] for i in range(20)]
+        passed, failed = self.run_csv(rows)
+
+        self.assertEqual(passed[0], RESULT_HEADER)
+        self.assertEqual(failed[0], RESULT_HEADER)
+        self.assertEqual([row[2] for row in passed[1:]], [str(i) for i in range(20) if i % 3])
+        self.assertEqual([row[2] for row in failed[1:]], [str(i) for i in range(20) if not i % 3])
+        self.assertTrue(all(row[3:] == ["pass", "alive"] for row in passed[1:]))
+        self.assertTrue(all(row[3:] == ["fail", "dead"] for row in failed[1:]))
+
+    def test_blank_short_and_offline_rows(self):
+        passed, failed = self.run_csv([
+            ["a@alive.test", "", "A"],
+            [],
+            ["not-an-email", "", "B"],
+            ["b@dead.test"],
+            ["c@mailinator.com", "", "C"],
+        ])
+
+        self.assertEqual(passed[1:], [["a@alive.test", "", "A", "pass", "alive"]])
+        self.assertEqual(failed[1:], [
+            ["not-an-email", "", "B", "fail", "bad_syntax"],
+            # Padded to the header's width before the result columns
+            ["b@dead.test", "", "", "fail", "dead"],
+            ["c@mailinator.com", "", "C", "fail", "disposable"],
+        ])
+
+    def test_failures_are_reported_per_row(self):
+        passed, failed = self.run_csv([
+            ["a@boom.test", "", "A"],
+            ["b@alive.test", "", "B"],
+            ["c@err.test", "", "C"],
+            ["d@boom.test", "", "D"],
+        ])
+
+        self.assertEqual(passed[1:], [["b@alive.test", "", "B", "pass", "alive"]])
+        self.assertEqual(failed[1:], [
+            ["a@boom.test", "", "A", "fail", "exception:batch died"],
+            ["c@err.test", "", "C", "fail", "exception:rcpt blew up"],
+            ["d@boom.test", "", "D", "fail", "exception:batch died"],
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
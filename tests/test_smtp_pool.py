@@ -0,0 +1,108 @@
+import socket
+import time
+import unittest
+from unittest import mock
+
+import validate_email
+from validate_email import SMTPPool
+
+from tests.fake_smtp import FakeSMTPServer, wait_for
+
+
+class SMTPPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = SMTPPool()
+        self.addCleanup(self.pool.close_all)
+        self.server = FakeSMTPServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        validate_email.SMTP_BANNER_CACHE.clear()
+
+    def rcpt(self, email, server=None, pool=None):
+        server = server or self.server
+        return (pool or self.pool).check_rcpt("127.0.0.1", email, port=server.port, timeout=2)
+
+    def test_reuses_session_with_rset(self):
+        self.assertEqual(self.rcpt("a@x.test"), (250, "fake.test ESMTP"))
+        self.assertEqual(self.rcpt("nobody@x.test"), (550, "fake.test ESMTP"))
+        self.assertEqual(self.rcpt("b@x.test")[0], 250)
+        self.assertEqual(self.server.connections, 1)
+        self.assertTrue(wait_for(lambda: self.server.rsets == 2))
+
+    def test_4xx_discards_session(self):
+        self.assertEqual(self.rcpt("greylist@x.test")[0], 451)
+        self.assertTrue(wait_for(lambda: self.server.quits == 1))
+        self.assertEqual(self.rcpt("a@x.test")[0], 250)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.server.rsets, 0)
+
+    def test_retries_once_when_idle_session_was_dropped(self):
+        self.rcpt("a@x.test")
+        self.server.drop_on_rset = True
+        self.assertEqual(self.rcpt("b@x.test")[0], 250)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_idle_sessions_capped_across_hosts(self):
+        pool = SMTPPool(max_idle=2)
+        self.addCleanup(pool.close_all)
+        servers = [self.server] + [FakeSMTPServer().__enter__() for _ in range(2)]
+        for server in servers[1:]:
+            self.addCleanup(server.__exit__)
+
+        for server in servers:
+            self.assertEqual(self.rcpt("a@x.test", server, pool)[0], 250)
+
+        self.assertEqual(pool.idle_room(), 0)
+        # The least recently used session is the one closed
+        self.assertTrue(wait_for(lambda: servers[0].quits == 1))
+        self.assertEqual([s.quits for s in servers[1:]], [0, 0])
+
+    def test_reaps_sessions_idle_too_long(self):
+        pool = SMTPPool(idle_timeout=0.05)
+        self.addCleanup(pool.close_all)
+        self.rcpt("a@x.test", pool=pool)
+        time.sleep(0.1)
+        self.rcpt("a@x.test", pool=pool)
+        self.assertEqual(self.server.connections, 2)
+        self.assertTrue(wait_for(lambda: self.server.quits == 1))
+
+
+class BannerPrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeSMTPServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.pool = SMTPPool()
+        self.addCleanup(self.pool.close_all)
+        validate_email.SMTP_BANNER_CACHE.clear()
+        validate_email.reset_banner_prefetch()
+        self.addCleanup(validate_email.reset_banner_prefetch)
+
+        async def loopback(hosts):
+            return {host: ["127.0.0.1"] for host in hosts}
+
+        for patch in (mock.patch.object(validate_email, "SMTP_POOL", self.pool),
+                      mock.patch.object(validate_email, "resolve_all_a", loopback)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_adopted_session_is_reused(self):
+        banners = validate_email.open_smtp_banners(["mx.test"], port=self.server.port)
+        self.assertEqual(banners, {"mx.test": "fake.test ESMTP"})
+        self.assertEqual(self.pool.idle_room(), self.pool.max_idle - 1)
+
+        code, banner = self.pool.check_rcpt("mx.test", "a@x.test", port=self.server.port, timeout=2)
+        self.assertEqual((code, banner), (250, "fake.test ESMTP"))
+        self.assertEqual(self.server.connections, 1)
+
+    def test_missed_greeting_keeps_cached_banner(self):
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+        closed.close()
+        validate_email.SMTP_BANNER_CACHE[f"mx.test:{port}"] = "mx.google.com ESMTP"
+
+        self.assertEqual(validate_email.open_smtp_banners(["mx.test"], port=port), {})
+        self.assertEqual(validate_email.SMTP_BANNER_CACHE[f"mx.test:{port}"], "mx.google.com ESMTP")
+
+
+if __name__ == "__main__":
+    unittest.main()
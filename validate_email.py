@@ -1,32 +1,257 @@
+import os
 import csv
-import re
+import json
+import errno
 import socket
+import asyncio
+import selectors
+import dbm
+import shelve
+import functools
+import importlib.util
+from contextlib import contextmanager
 import smtplib
-import requests
+import time
+import atexit
+import sys
+import threading
+from sys import intern
+import httpx
 import dns.resolver
+import dns.exception
+import dns.asyncresolver
 from tqdm import tqdm
+from itertools import islice
+from collections import OrderedDict, defaultdict, deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Tuple
+from typing import Any, Callable, Coroutine, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, cast
+
+# Offline per-email stages; compiled by mypyc when built, plain Python otherwise
+# (the unused names are re-exported, they used to be defined here)
+from _pipeline import (  # noqa: F401
+    DISPOSABLE_DOMAINS, DISPOSABLE_DOMAINS_FILE, EMAIL_REGEX, RCPT_DECISIONS, cell, classify_banner,
+    final_verdict, heuristics, load_disposable_domains, prefilter, process_row, row_domain, validate_syntax,
+)
+
+# HTTP/2 lets requests to hosts behind one CDN share a connection; needs httpx[http2]
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 # -------------------------
 # CACHES
 # -------------------------
-MX_CACHE = {}
-WEBSITE_CACHE = {}
-SMTP_BANNER_CACHE = {}
-SMTP_RESULT_CACHE = {}
+# MX and RCPT answers are kept across runs in this shelve file, relative to the
+# working directory; set to None before the first lookup to disable it
+CACHE_DB = "email_cache.db"
+
+_MISS = object()
+
+class KeyedLock:
+    """One lock per key, so only a single thread does the miss-path work for it."""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def __call__(self, key):
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+        try:
+            with lock:
+                yield
+        finally:
+            # The result is cached by now, so later callers never need this lock
+            with self._guard:
+                if self._locks.get(key) is lock:
+                    del self._locks[key]
+
+class DiskCache:
+    """Thread-safe shelve wrapper, opened on first use.
+
+    Any failure of the file (unreadable, corrupt entry, full disk) turns
+    persistence off for the rest of the run instead of failing lookups.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        # None means CACHE_DB as it is when the cache is first used
+        self.path = path
+        self.disabled = False
+        self._db: Optional[shelve.Shelf] = None
+        self._lock = threading.Lock()
+
+    def _disable(self, error: Exception):
+        # Caller holds self._lock
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+        self.disabled = True
+        tqdm.write(f"Email cache disabled ({error.__class__.__name__}: {error})", file=sys.stderr)
+
+    def _open(self) -> Optional[shelve.Shelf]:
+        if self._db is None and not self.disabled:
+            path = self.path or CACHE_DB
+            if not path:
+                self.disabled = True
+                return None
+            try:
+                self._db = shelve.open(path, writeback=False)
+            except dbm.error as e:
+                # dbm.error is a tuple that already includes OSError
+                self._disable(e)
+        return self._db
+
+    def get(self, key: str):
+        with self._lock:
+            db = self._open()
+            if db is None:
+                return None
+            try:
+                return db.get(key)
+            except Exception as e:
+                self._disable(e)
+                return None
+
+    def set(self, key: str, entry):
+        with self._lock:
+            db = self._open()
+            if db is None:
+                return
+            try:
+                db[key] = entry
+            except Exception as e:
+                self._disable(e)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+DISK_CACHE = DiskCache()
+atexit.register(DISK_CACHE.close)
+
+class TTLCache:
+    """Bounded in-memory cache backed by DISK_CACHE; failures expire sooner than answers."""
+
+    def __init__(self, name: str, maxsize: int = 100_000, ttl: float = 900.0, negative_ttl: float = 60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: Dict[Any, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            if len(self._data) > self.maxsize:
+                del self._data[next(iter(self._data))]
+
+    def get(self, key, default=None):
+        now = time.time()
+        entry = self._data.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        entry = DISK_CACHE.get(f"{self.name}|{key}")
+        if entry is not None and entry[1] > now:
+            self._store(key, entry)
+            return entry[0]
+        return default
+
+    def set(self, key, value, negative: bool = False):
+        entry = (value, time.time() + (self.negative_ttl if negative else self.ttl))
+        self._store(key, entry)
+        DISK_CACHE.set(f"{self.name}|{key}", entry)
+
+class TransientResult(Exception):
+    """Raised by a cached lookup whose answer is only worth keeping briefly."""
+
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
+
+T = TypeVar("T")
+
+def cached(cache: TTLCache, key_fn: Callable[..., Any]) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Serve fn from cache; a TransientResult is cached with the short negative TTL."""
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        locks = KeyedLock()
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            key = key_fn(*args, **kwargs)
+            value = cache.get(key, _MISS)
+            if value is not _MISS:
+                return value
+
+            with locks(key):
+                value = cache.get(key, _MISS)
+                if value is _MISS:
+                    try:
+                        value = fn(*args, **kwargs)
+                        cache.set(key, value)
+                    except TransientResult as e:
+                        value = e.value
+                        cache.set(key, value, negative=True)
+            return value
+        return wrapper
+    return decorator
+
+MX_CACHE = TTLCache("mx")
+WEBSITE_CACHE: Dict[str, bool] = {}
+WEBSITE_LOCKS = KeyedLock()
+SMTP_BANNER_CACHE: Dict[str, str] = {}
+SMTP_RESULT_CACHE = TTLCache("smtp")
 
 # -------------------------
-# REGEX SYNTAX
+# CONCURRENCY
 # -------------------------
-EMAIL_REGEX = re.compile(
-    r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
-)
+# Every stage is socket-bound, so run far more threads than cores
+DEFAULT_WORKERS = 48
+# Rows of one domain handled by a single task; big domains get several tasks
+# so every pooled SMTP session for their MX stays busy
+DOMAIN_BATCH = 50
+# Input rows read, validated and written per step of the streaming CSV driver
+STREAM_BLOCK = 5000
 
-def validate_syntax(email: str) -> bool:
-    if not email or "@" not in email:
-        return False
-    return EMAIL_REGEX.match(email.strip()) is not None
+# -------------------------
+# DNS RESOLVER (one instance shared by all worker threads)
+# -------------------------
+RESOLVER = dns.resolver.Resolver()
+RESOLVER.cache = dns.resolver.LRUCache(max_size=20000)
+RESOLVER.lifetime = 4.0
+RESOLVER.timeout = 2.0
+
+# Used to prefetch a whole block's MX records at once; shares RESOLVER's cache
+ASYNC_RESOLVER = dns.asyncresolver.Resolver()
+ASYNC_RESOLVER.cache = RESOLVER.cache
+ASYNC_RESOLVER.lifetime = RESOLVER.lifetime
+ASYNC_RESOLVER.timeout = RESOLVER.timeout
+MX_PREFETCH_CONCURRENCY = 500
+
+# -------------------------
+# HTTP CLIENT (keep-alive pool shared by all worker threads)
+# -------------------------
+HTTP_POOL_SIZE = max(64, DEFAULT_WORKERS)
+HTTP_RETRY_STATUSES = (502, 503, 504)
+
+HTTP_CLIENT = httpx.Client(
+    timeout=6,
+    follow_redirects=True,
+    # Pool limits and HTTP/2 live on the transport when one is passed explicitly
+    transport=httpx.HTTPTransport(
+        http2=HTTP2_AVAILABLE,
+        retries=1,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=HTTP_POOL_SIZE),
+    ),
+)
+atexit.register(HTTP_CLIENT.close)
 
 # -------------------------
 # WEBSITE PRESENCE (convert www → https automatically)
@@ -35,11 +260,18 @@ def check_website(domain: str) -> bool:
     if not domain:
         return False
 
-    if domain in WEBSITE_CACHE:
-        return WEBSITE_CACHE[domain]
-
     domain = domain.strip()
+    up = WEBSITE_CACHE.get(domain)
+    if up is not None:
+        return up
 
+    with WEBSITE_LOCKS(domain):
+        up = WEBSITE_CACHE.get(domain)
+        if up is None:
+            up = WEBSITE_CACHE[domain] = _probe_website(domain)
+    return up
+
+def _probe_website(domain: str) -> bool:
     # Convert www.* or bare domain to https://www.domain or https://domain
     if domain.startswith("www."):
         url = "https://" + domain
@@ -48,192 +280,644 @@ def check_website(domain: str) -> bool:
     else:
         url = domain
 
-    try:
-        r = requests.get(url, timeout=6)
-        WEBSITE_CACHE[domain] = (200 <= r.status_code < 400)
-        return WEBSITE_CACHE[domain]
-    except:
-        WEBSITE_CACHE[domain] = False
-        return False
+    for _ in range(2):
+        try:
+            return _status_ok(url)
+        except (httpx.RemoteProtocolError, httpx.ReadError):
+            # Usually a keep-alive connection the server already dropped; retry on a fresh one
+            continue
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError):
+            # ValueError covers the UnicodeError from IDNA-encoding a malformed host
+            return False
+    return False
+
+def _status_ok(url: str) -> bool:
+    r = HTTP_CLIENT.head(url)
+    if r.status_code in HTTP_RETRY_STATUSES:
+        time.sleep(0.2)
+        r = HTTP_CLIENT.head(url)
+    if r.status_code in (405, 501):
+        # Some servers refuse HEAD; fall back to GET without reading the body
+        with HTTP_CLIENT.stream("GET", url) as r:
+            pass
+    return 200 <= r.status_code < 400
 
 # -------------------------
 # MX RECORD CHECK
 # -------------------------
-def check_mx(domain: str, lifetime: float = 5.0) -> List[str]:
-    domain = domain.lower().strip()
-    if domain in MX_CACHE:
-        return MX_CACHE[domain]
+# Answers that say "no MX here" are final; timeouts and dead nameservers are worth a retry
+DNS_FINAL_ERRORS = (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN)
+DNS_RETRY_ERRORS = (dns.exception.Timeout, dns.resolver.NoNameservers)
+
+# Static MX for the biggest providers (refresh with refresh_known_mx.py)
+KNOWN_MX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "known_mx.json")
 
+def load_known_mx(path: str = KNOWN_MX_FILE) -> Dict[str, List[str]]:
     try:
-        answers = dns.resolver.resolve(domain, "MX", lifetime=lifetime)
-        recs = sorted([str(r.exchange).rstrip(".") for r in answers])
-        MX_CACHE[domain] = recs
-        return recs
-    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.Timeout, dns.exception.DNSException):
-        MX_CACHE[domain] = []
-        return []
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {intern(domain.lower()): sorted(hosts) for domain, hosts in data.items()}
+
+KNOWN_MX = load_known_mx()
+
+def check_mx(domain: str, lifetime: float = 4.0) -> List[str]:
+    known = KNOWN_MX.get(domain.lower().strip())
+    if known is not None:
+        return known
+    return _resolve_mx(domain, lifetime)
+
+@cached(MX_CACHE, lambda domain, *_, **__: intern(domain.lower().strip()))
+def _resolve_mx(domain: str, lifetime: float = 4.0) -> List[str]:
+    domain = domain.lower().strip()
+    for attempt_lifetime in (lifetime, lifetime * 2):
+        try:
+            answers = RESOLVER.resolve(domain, "MX", lifetime=attempt_lifetime)
+            return sorted([str(r.exchange).rstrip(".") for r in answers])
+        except DNS_FINAL_ERRORS:
+            return []
+        except DNS_RETRY_ERRORS:
+            continue
+        except dns.exception.DNSException:
+            # Malformed names and the like: no point asking again
+            return []
+    raise TransientResult([])
+
+async def _resolve_all(names: List[str], rdtype: str, parse) -> dict:
+    sem = asyncio.Semaphore(MX_PREFETCH_CONCURRENCY)
+
+    async def one(name: str):
+        async with sem:
+            try:
+                return name, parse(await ASYNC_RESOLVER.resolve(name, rdtype))
+            except DNS_RETRY_ERRORS:
+                # Unknown, not empty: left to the slower retrying lookup
+                return name, None
+            except dns.exception.DNSException:
+                return name, []
 
-# -------------------------
-# SMTP BANNER
-# -------------------------
-def smtp_banner(host: str, port: int = 25, timeout: float = 6.0) -> str:
-    key = f"{host}:{port}"
-    if key in SMTP_BANNER_CACHE:
-        return SMTP_BANNER_CACHE[key]
+    return dict(await asyncio.gather(*(one(n) for n in names)))
+
+async def resolve_all_mx(domains: List[str]) -> dict:
+    """Resolve MX for many domains concurrently on one event loop."""
+    return await _resolve_all(domains, "MX", lambda answers: sorted([str(r.exchange).rstrip(".") for r in answers]))
+
+async def resolve_all_a(hosts: List[str]) -> dict:
+    """Resolve IPv4 addresses for many hosts concurrently on one event loop."""
+    return await _resolve_all(hosts, "A", lambda answers: [r.address for r in answers])
 
+def _run_coroutine(coro: Coroutine[Any, Any, T]) -> T:
+    """asyncio.run() that also works when the caller is inside a running event loop.
+
+    Jupyter, IPython and async applications already run a loop, and asyncio.run()
+    refuses to nest; the coroutine then gets a private loop on a helper thread.
+    """
     try:
-        with socket.create_connection((host, port), timeout=timeout) as sock:
-            sock.settimeout(timeout)
-            banner = sock.recv(1024).decode(errors="ignore").strip()
-            SMTP_BANNER_CACHE[key] = banner
-            return banner
-    except Exception:
-        SMTP_BANNER_CACHE[key] = ""
-        return ""
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()
+
+def prefetch_mx(domains: Iterable[str]) -> None:
+    """Fill MX_CACHE for every domain not already cached, in one concurrent pass.
+
+    Domains that timed out are left uncached so check_mx retries them itself.
+    """
+    missing = [d for d in domains if d and d not in KNOWN_MX and MX_CACHE.get(d, _MISS) is _MISS]
+    if not missing:
+        return
+    for domain, recs in _run_coroutine(resolve_all_mx(missing)).items():
+        if recs is not None:
+            MX_CACHE.set(domain, recs)
 
 # -------------------------
-# NULL SENDER RCPT CHECK
+# SMTP CONNECTION POOL (RSET-based reuse per MX host)
 # -------------------------
-def smtp_null_sender(host: str, email: str, port: int = 25, timeout: float = 8.0) -> int:
-    key = f"{host}:{port}|{email}"
-    if key in SMTP_RESULT_CACHE:
-        return SMTP_RESULT_CACHE[key]
+# (session, RCPTs sent on it, when it was opened)
+_Session = Tuple[smtplib.SMTP, int, float]
+
+class SMTPPool:
+    """Keeps a few open SMTP sessions per MX host and reuses them with RSET.
+
+    Idle sessions are capped across all hosts (least recently used go first)
+    and closed once they sit unused for idle_timeout, so a list with many
+    distinct MX hosts doesn't pile up open sockets.
+    """
+
+    def __init__(self, max_conns: int = 3, max_uses: int = 100, max_age: float = 300.0,
+                 max_idle: int = 64, idle_timeout: float = 30.0):
+        self.max_conns = max_conns
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[str, Deque[_Session]] = {}
+        # server -> (key, its idle entry, when it was released), oldest first
+        self._lru: "OrderedDict[smtplib.SMTP, Tuple[str, _Session, float]]" = OrderedDict()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_slots(self, key: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.max_conns)
+            return self._slots[key]
+
+    def _unlink(self, key: str, entry) -> None:
+        # Caller holds self._lock
+        sessions = self._idle[key]
+        sessions.remove(entry)
+        if not sessions:
+            del self._idle[key]
+
+    def _reap(self) -> List[smtplib.SMTP]:
+        # Caller holds self._lock; returns the sessions to close outside it
+        now = time.monotonic()
+        stale = []
+        while self._lru:
+            server, (key, entry, released_at) = next(iter(self._lru.items()))
+            if len(self._lru) <= self.max_idle and now - released_at <= self.idle_timeout:
+                break
+            del self._lru[server]
+            self._unlink(key, entry)
+            stale.append(server)
+        return stale
+
+    def _take(self, key: str):
+        """Pop a reusable idle session for key, or None."""
+        now = time.monotonic()
+        found = None
+        with self._lock:
+            stale = self._reap()
+            while key in self._idle:
+                entry = self._idle[key][-1]
+                self._unlink(key, entry)
+                del self._lru[entry[0]]
+                _, uses, created_at = entry
+                if uses < self.max_uses and now - created_at <= self.max_age:
+                    found = entry
+                    break
+                stale.append(entry[0])
+        for server in stale:
+            self._close(server)
+        return found
+
+    def _put(self, key: str, entry) -> bool:
+        """Park a session as idle; closes it instead if its host already has enough."""
+        with self._lock:
+            sessions = self._idle.setdefault(key, deque())
+            accepted = len(sessions) < self.max_conns
+            if accepted:
+                sessions.append(entry)
+                self._lru[entry[0]] = (key, entry, time.monotonic())
+            stale = self._reap()
+        if not accepted:
+            stale.append(entry[0])
+        for server in stale:
+            self._close(server)
+        return accepted and entry[0] not in stale
+
+    def idle_room(self) -> int:
+        """How many more idle sessions fit under max_idle."""
+        with self._lock:
+            return max(self.max_idle - len(self._lru), 0)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except (OSError, smtplib.SMTPException):
+            server.close()
 
-    code = 0
-    try:
-        server = smtplib.SMTP(host=host, port=port, timeout=timeout)
+    def _connect(self, host: str, port: int, timeout: float) -> smtplib.SMTP:
+        key = f"{host}:{port}"
+        server = smtplib.SMTP(timeout=timeout)
         server.set_debuglevel(0)
+        try:
+            _, banner = server.connect(host, port)
+        except (OSError, ValueError, smtplib.SMTPException):
+            SMTP_BANNER_CACHE[key] = ""
+            server.close()
+            raise
+        SMTP_BANNER_CACHE[key] = banner.decode(errors="ignore").strip()
+        try:
+            self._greet(server)
+        except OSError:
+            # Timeout or reset during EHLO/HELO: the caller never sees this session
+            server.close()
+            raise
+        return server
+
+    @staticmethod
+    def _greet(server: smtplib.SMTP):
         try:
             server.ehlo()
-        except Exception:
+        except smtplib.SMTPException:
             try:
                 server.helo()
-            except Exception:
+            except smtplib.SMTPException:
                 pass
-        server.mail('')
-        rcpt = server.rcpt(email)
-        if isinstance(rcpt, tuple) and len(rcpt) >= 1:
-            raw_code = rcpt[0]
+
+    def adopt(self, host: str, sock: socket.socket, port: int = 25, timeout: float = 8.0):
+        """Add a connected socket whose greeting was already read as an idle session."""
+        server = smtplib.SMTP(timeout=timeout)
+        server.set_debuglevel(0)
+        sock.setblocking(True)
+        sock.settimeout(timeout)
+        server.sock = sock
+        server._host = host  # type: ignore[attr-defined]  # what connect() would have set; starttls() reads it
+        self._put(f"{host}:{port}", (server, 0, time.monotonic()))
+
+    def _acquire(self, host: str, port: int, timeout: float):
+        entry = self._take(f"{host}:{port}")
+        if entry is not None:
+            return entry
+        return self._connect(host, port, timeout), 0, time.monotonic()
+
+    def check_rcpt(self, host: str, email: str, port: int = 25, timeout: float = 8.0) -> Tuple[int, str]:
+        """RCPT on a pooled session; returns (code, greeting banner of the host)."""
+        key = f"{host}:{port}"
+        with self._host_slots(key):
+            code = self._rcpt(host, email, port, timeout)
+        return code, SMTP_BANNER_CACHE.get(key, "")
+
+    def _rcpt(self, host: str, email: str, port: int, timeout: float) -> int:
+        for attempt in range(2):
             try:
-                code = int(raw_code)
-            except Exception:
-                try:
-                    code = int(raw_code.decode() if isinstance(raw_code, bytes) else raw_code)
-                except Exception:
-                    code = 0
-        server.quit()
-    except Exception:
-        code = 0
+                server, uses, created_at = self._acquire(host, port, timeout)
+            except (OSError, ValueError, smtplib.SMTPException):
+                return 0
 
-    SMTP_RESULT_CACHE[key] = code
-    return code
+            try:
+                if uses:
+                    server.rset()
+                elif server.ehlo_resp is None and server.helo_resp is None:
+                    # Adopted from open_smtp_banners: greeted, but no EHLO yet
+                    self._greet(server)
+                server.mail('')
+                code, _ = server.rcpt(email)
+                break
+            except smtplib.SMTPServerDisconnected:
+                # Typically an idle session the server timed out; try once more on another
+                server.close()
+                if attempt:
+                    return 0
+            except (OSError, smtplib.SMTPException):
+                server.close()
+                return 0
+
+        if 400 <= code < 500:
+            # Greylisting / rate limiting: don't keep a session the server is unhappy with
+            self._close(server)
+        else:
+            self._put(f"{host}:{port}", (server, uses + 1, created_at))
+        return code
+
+    def close_all(self):
+        with self._lock:
+            servers = list(self._lru)
+            self._lru.clear()
+            self._idle.clear()
+        for server in servers:
+            self._close(server)
+
+SMTP_POOL = SMTPPool()
+atexit.register(SMTP_POOL.close_all)
 
 # -------------------------
-# HEURISTICS
+# SMTP BANNER PREFETCH (non-blocking connects multiplexed on one selector)
 # -------------------------
-def heuristics(banner: str, rcpt_code: int, website_up: bool) -> str:
-    b = (banner or "").lower()
-    if rcpt_code is None:
-        rcpt_code = 0
-
-    if "google" in b or "gmail" in b:
-        if rcpt_code == 250: return "alive"
-        if rcpt_code in (550, 551, 553): return "dead"
-        return "unknown" if not website_up else "likely_alive"
+def _greeting_done(buf: bytes) -> bool:
+    # The last line of a (possibly multi-line) greeting is "220 text", not "220-text"
+    if not buf.endswith(b"\n"):
+        return False
+    last = buf.rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+    return len(last) < 4 or last[3:4] != b"-"
+
+# Sockets opened at once by open_smtp_banners, and how long a connect may take
+BANNER_WAVE = 128
+BANNER_CONNECT_TIMEOUT = 2.0
+# Outbound port 25 counts as blocked once this many hosts were tried and none
+# greeted us; reset_banner_prefetch() starts a new sample (every process_csv run)
+BANNER_MIN_SAMPLE = 32
+_banner_tried = 0
+_banner_greeted = 0
+# Hosts open_smtp_banners already tried, greeted or not, so later blocks skip them
+_banner_attempted: set = set()
+
+def reset_banner_prefetch() -> None:
+    global _banner_tried, _banner_greeted
+    _banner_tried = _banner_greeted = 0
+    _banner_attempted.clear()
+
+def banner_prefetch_enabled() -> bool:
+    return _banner_greeted > 0 or _banner_tried < BANNER_MIN_SAMPLE
+
+def _banner_wave(targets: List[Tuple[str, str]], port: int, timeout: float,
+                 connect_timeout: float, banners: dict) -> int:
+    """Connect to (host, ip) pairs on one selector; returns how many greeted us."""
+    sel = selectors.DefaultSelector()
+    for host, ip in targets:
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            if sock.connect_ex((ip, port)) not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                sock.close()
+                continue
+        except OSError:
+            # Out of file descriptors or similar; the pool connects later if needed
+            if sock is not None:
+                sock.close()
+            continue
+        sel.register(sock, selectors.EVENT_WRITE, [host, b""])
+
+    greeted = 0
+    start = time.monotonic()
+    connect_deadline = start + connect_timeout
+    deadline = start + timeout
+    while sel.get_map():
+        now = time.monotonic()
+        if now >= connect_deadline:
+            # Give up on connects that haven't finished yet
+            for key in [k for k in sel.get_map().values() if k.events == selectors.EVENT_WRITE]:
+                sel.unregister(key.fileobj)
+                cast(socket.socket, key.fileobj).close()
+            if not sel.get_map():
+                break
+        if now >= deadline:
+            break
+        wake = deadline if now >= connect_deadline else connect_deadline
+        for key, events in sel.select(wake - now):
+            sock, state = cast(socket.socket, key.fileobj), key.data
+            if events & selectors.EVENT_WRITE:
+                if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR):
+                    sel.unregister(sock)
+                    sock.close()
+                else:
+                    sel.modify(sock, selectors.EVENT_READ, state)
+                continue
 
-    if "outlook" in b or "microsoft" in b or "hotmail" in b:
-        if rcpt_code == 250: return "alive"
-        if rcpt_code in (550, 551, 553): return "dead"
-        return "unknown" if not website_up else "likely_alive"
+            try:
+                chunk = sock.recv(4096)
+            except BlockingIOError:
+                continue
+            except OSError:
+                chunk = b""
+            if not chunk:
+                sel.unregister(sock)
+                sock.close()
+                continue
+
+            state[1] += chunk
+            if _greeting_done(state[1]):
+                sel.unregister(sock)
+                host, lines = state[0], state[1].splitlines()
+                # Same shape as smtplib's reply text: codes stripped, lines joined by \n
+                banner = b"\n".join(l[4:].strip() for l in lines).decode(errors="ignore").strip()
+                banners[host] = banner
+                greeted += 1
+                # Stored before adopting so a worker picking the session up sees it; never
+                # replaces a banner a worker's own connect already recorded
+                if not SMTP_BANNER_CACHE.get(f"{host}:{port}"):
+                    SMTP_BANNER_CACHE[f"{host}:{port}"] = banner
+                if lines[-1][:3] == b"220" and SMTP_POOL.idle_room():
+                    SMTP_POOL.adopt(host, sock, port=port)
+                else:
+                    sock.close()
+
+    for key in list(sel.get_map().values()):
+        sel.unregister(key.fileobj)
+        cast(socket.socket, key.fileobj).close()
+    sel.close()
+    return greeted
+
+def open_smtp_banners(hosts: List[str], port: int = 25, timeout: float = 6.0,
+                      connect_timeout: float = BANNER_CONNECT_TIMEOUT) -> dict:
+    """Connect to hosts in waves, read their greetings and hand the sessions to SMTP_POOL.
+
+    Returns the banners actually received; hosts that didn't greet us in time
+    are left to the pool's own connect.
+    """
+    global _banner_tried, _banner_greeted
+    _banner_attempted.update(f"{host}:{port}" for host in hosts)
+    addrs = _run_coroutine(resolve_all_a(hosts))
+    banners: Dict[str, str] = {}
+
+    # Hosts with no A answer (or a timeout) are left to the pool's smtplib connect
+    targets = [(host, ips[0]) for host, ips in addrs.items() if ips]
+    for i in range(0, len(targets), BANNER_WAVE):
+        wave = targets[i:i + BANNER_WAVE]
+        _banner_greeted += _banner_wave(wave, port, timeout, connect_timeout, banners)
+        _banner_tried += len(wave)
+        if not banner_prefetch_enabled():
+            # Nobody greeted us (port 25 filtered?): stop paying the wave timeout on every block
+            break
+    return banners
+
+def prefetch_banners(domains: Iterable[str], port: int = 25) -> None:
+    """Open sessions to the first MX of every domain whose host we haven't greeted yet."""
+    if not banner_prefetch_enabled():
+        return
+    hosts = set()
+    for domain in domains:
+        if not domain:
+            continue
+        host = (KNOWN_MX.get(domain) or MX_CACHE.get(domain) or [domain])[0]
+        key = f"{host}:{port}"
+        if key not in SMTP_BANNER_CACHE and key not in _banner_attempted:
+            hosts.add(host)
+    # Sessions past the pool's idle cap would just be closed again
+    room = SMTP_POOL.idle_room()
+    if hosts and room:
+        open_smtp_banners(sorted(hosts)[:room], port=port)
 
-    if rcpt_code == 250:
-        return "alive"
-    if rcpt_code in (550, 551, 552, 553):
-        return "dead"
-    if website_up and rcpt_code == 0:
-        return "likely_alive"
-    return "unknown"
+# -------------------------
+# NULL SENDER RCPT CHECK
+# -------------------------
+@cached(SMTP_RESULT_CACHE, lambda host, email, port=25, **_: f"{host}:{port}|{email}")
+def smtp_null_sender(host: str, email: str, port: int = 25, timeout: float = 8.0) -> Tuple[int, str]:
+    """RCPT TO with a null sender; returns (rcpt code, banner) from the same session."""
+    code, banner = SMTP_POOL.check_rcpt(host, email, port=port, timeout=timeout)
+    if code == 0 or 400 <= code < 500:
+        # No answer or a 4xx (greylisting, rate limits) is worth asking again soon
+        raise TransientResult((code, banner))
+    return code, banner
 
 # -------------------------
 # FULL PIPELINE
 # -------------------------
-def validate_email_pipeline(email: str, web: str = None) -> Tuple[str, str]:
+def validate_email_pipeline(email: Optional[str], web: Optional[str] = None) -> Tuple[str, str]:
     email = (email or "").strip()
     web = (web or "").strip()
 
-    if not validate_syntax(email):
-        return "fail", "bad_syntax"
+    verdict = prefilter(email)
+    if verdict:
+        return verdict
 
-    domain = email.split("@")[-1].strip().lower()
-    if not domain:
-        return "fail", "bad_domain"
+    # Interned so every cache lookup for a repeated domain compares by identity
+    _, _, domain = email.rpartition("@")
+    return check_network(email, intern(domain.lower()), web)
 
-    website_up = False
+def check_network(email: str, domain: str, web: str = "") -> Tuple[str, str]:
+    """Network stage only, for an email that already passed prefilter; domain is its lowercased part."""
+    website_up: bool = False
     if web:
         website_up = check_website(web)
 
-    mx = check_mx(domain)
-    fallback_hosts = mx if mx else [domain]
+    mx: List[str] = check_mx(domain)
+    fallback_hosts: List[str] = mx if mx else [domain]
 
-    banner = ""
-    rcpt_code = 0
+    banner: str = ""
+    rcpt_code: int = 0
     for host in fallback_hosts:
-        banner = smtp_banner(host)
-        rcpt_code = smtp_null_sender(host, email)
+        rcpt_code, banner = smtp_null_sender(host, email)
         if rcpt_code in (250, 550, 551, 552, 553):
             break
 
-    decision = heuristics(banner, rcpt_code, website_up)
-
-    if website_up and mx and rcpt_code == 250:
-        return "pass", "website_up_mx_rcpt250"
-    if decision == "alive" or decision == "likely_alive":
-        return "pass", decision
-    return "fail", decision
+    return final_verdict(website_up, bool(mx), rcpt_code, banner)
 
 # -------------------------
 # CSV / Bulk
 # -------------------------
-def process_row(row: dict) -> dict:
-    email = row.get("Email", "").strip()
-    web = row.get("Web Address", "").strip()
-    status, reason = validate_email_pipeline(email, web)
-    row["Validation Status"] = status
-    row["Validation Reason"] = reason
-    return row
-
-def process_csv(input_file: str, pass_file: str = "pass.csv", fail_file: str = "fail.csv", workers: int = 10):
-    with open(input_file, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        headers = list(reader.fieldnames or []) + ["Validation Status", "Validation Reason"]
-        rows = list(reader)
-
-    pass_rows = []
-    fail_rows = []
-
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = [ex.submit(process_row, row) for row in rows]
-        for fut in tqdm(as_completed(futures), total=len(futures), desc="Validating"):
-            try:
-                result = fut.result()
-            except Exception as e:
-                result = {"Email": "", "Web Address": "", "Validation Status": "fail", "Validation Reason": f"exception:{e}"}
-            if result.get("Validation Status") == "pass":
-                pass_rows.append(result)
-            else:
-                fail_rows.append(result)
-
-    with open(pass_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(pass_rows)
-
-    with open(fail_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(fail_rows)
-
-    print(f"\n✓ Completed. Passed: {len(pass_rows)}  Failed: {len(fail_rows)}")
+EMAIL_COL = "Email"
+WEB_COL = "Web Address"
+RESULT_COLS = ["Validation Status", "Validation Reason"]
+# Large file buffers so csv reads and writes hit the OS in big chunks
+CSV_BUFFER = 1 << 20
+
+def process_batch(domain: str, batch: List[List[str]], email_idx: Optional[int], web_idx: Optional[int]) -> int:
+    # Resolve MX once; every row below then hits MX_CACHE and the SMTP pool.
+    # Rows are updated in place, so the caller keeps the input order.
+    if domain:
+        try:
+            check_mx(domain)
+        except Exception:
+            # Each row repeats the lookup below and reports its own failure
+            pass
+
+    # The driver already ran prefilter on these rows, and domain is their row_domain()
+    def validate(email: str, web: str) -> Tuple[str, str]:
+        return check_network(email, domain, web)
+
+    for row in batch:
+        try:
+            process_row(row, email_idx, web_idx, validate)
+        except Exception as e:
+            row.append("fail")
+            row.append(f"exception:{e}")
+    return len(batch)
+
+def _blocks(reader: Iterator[List[str]], size: int) -> Iterator[List[List[str]]]:
+    block = list(islice(reader, size))
+    while block:
+        yield block
+        block = list(islice(reader, size))
+
+def _count_rows(path: str) -> int:
+    # Cheap pre-count so the progress bar has a total without holding the rows:
+    # newlines counted in 1 MiB chunks in C, minus the header line
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+def process_csv(input_file: str, pass_file: str = "pass.csv", fail_file: str = "fail.csv", workers: int = DEFAULT_WORKERS) -> None:
+    total = _count_rows(input_file)
+    # A blocked port 25 seen by an earlier run may have been opened since
+    reset_banner_prefetch()
+
+    passed = failed = 0
+    with open(input_file, newline="", encoding="utf-8", buffering=CSV_BUFFER) as f, \
+            open(pass_file, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER) as pf, \
+            open(fail_file, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER) as ff, \
+            ThreadPoolExecutor(max_workers=workers) as ex, \
+            tqdm(total=total, desc="Validating") as bar:
+        reader = csv.reader(f)
+        fieldnames = next(reader, [])
+        email_idx = fieldnames.index(EMAIL_COL) if EMAIL_COL in fieldnames else None
+        web_idx = fieldnames.index(WEB_COL) if WEB_COL in fieldnames else None
+
+        pass_writer = csv.writer(pf)
+        fail_writer = csv.writer(ff)
+        pass_writer.writerow(fieldnames + RESULT_COLS)
+        fail_writer.writerow(fieldnames + RESULT_COLS)
+
+        # Caps queued batches so the executor never holds more than a few per worker
+        slots = threading.BoundedSemaphore(workers * 4)
+
+        def submit_bounded(fn, *args):
+            slots.acquire()
+            fut = ex.submit(fn, *args)
+            fut.add_done_callback(lambda _: slots.release())
+            return fut
+
+        def flush(block: List[List[str]], futures) -> None:
+            nonlocal passed, failed
+            for fut in as_completed(futures):
+                try:
+                    bar.update(fut.result())
+                except Exception as e:
+                    # Rows the batch never got to still need their result columns
+                    batch, widths = futures[fut]
+                    for row, width in zip(batch, widths):
+                        if len(row) == width:
+                            row.append("fail")
+                            row.append(f"exception:{e}")
+                    bar.update(len(batch))
+            for row in block:
+                if row[-2] == "pass":
+                    pass_writer.writerow(row)
+                    passed += 1
+                else:
+                    fail_writer.writerow(row)
+                    failed += 1
+
+        # At most two blocks are held: the next one is read, prefetched and queued
+        # while the previous one finishes, so workers don't idle at block edges.
+        # MX/SMTP caches carry over between blocks.
+        pending: deque = deque()
+        # Blank lines come through csv.reader as []; DictReader used to skip them
+        rows = (row for row in reader if row)
+        for block in _blocks(rows, STREAM_BLOCK):
+            buckets = defaultdict(list)
+            offline = 0
+            for row in block:
+                # Pad short rows so the result columns line up with the header
+                if len(row) < len(fieldnames):
+                    row.extend([""] * (len(fieldnames) - len(row)))
+                # Rows decided by syntax/disposable checks never reach the thread pool
+                verdict = prefilter(cell(row, email_idx))
+                if verdict:
+                    row.extend(verdict)
+                    offline += 1
+                else:
+                    buckets[row_domain(row, email_idx)].append(row)
+            bar.update(offline)
+
+            prefetch_mx(buckets)
+            prefetch_banners(buckets)
+            futures = {}
+            for domain, bucket in buckets.items():
+                for i in range(0, len(bucket), DOMAIN_BATCH):
+                    batch = bucket[i:i + DOMAIN_BATCH]
+                    fut = submit_bounded(process_batch, domain, batch, email_idx, web_idx)
+                    futures[fut] = (batch, [len(row) for row in batch])
+            pending.append((block, futures))
+            if len(pending) > 1:
+                flush(*pending.popleft())
+
+        while pending:
+            flush(*pending.popleft())
+
+    print(f"\n✓ Completed. Passed: {passed}  Failed: {failed}")
     print(f"Outputs → {pass_file}, {fail_file}")
 
 # CLI